@@ -3,76 +3,304 @@ Clear Recipes - Flask application
 A web app for displaying recipes step-by-step with smart features.
 """
 
-from flask import Flask, render_template, jsonify, request, redirect
+from flask import Flask, Response, render_template, jsonify, request, redirect, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 import os
 import re
-import json
+import functools
+from collections import namedtuple
 import string
 import random
 import argparse
+import atexit
+import queue
+import signal
+import sys
+import threading
+import orjson
 from datetime import datetime
-from recipe_parser import parse_recipe
+from recipe_parser import StepTable, _parse_recipe_table
 from recipe_scraper import scrape_recipe
-from ingredient_matcher import match_ingredients_to_step
-from timer_detector import detect_timers
+from ingredient_matcher import prepare_ingredient_index, match_step
+from timer_detector import detect_timers_bulk
 
 
-# File for storing saved recipes (can be backed up)
+# Directory holding one JSON file per saved recipe (can be backed up)
+SAVED_RECIPES_DIR = 'saved'
+
+# Index of saved recipe summaries keyed by ID, oldest first
+SAVED_RECIPES_INDEX = 'saved_recipes_index.json'
+
+# Legacy single-file store, split into the above on first load
 SAVED_RECIPES_FILE = 'saved_recipes.json'
 
+# Recipe fields kept in the index (enough for listing and short URLs)
+SUMMARY_FIELDS = ('id', 'share_id', 'title', 'serves', 'saved_at')
+
+# Loaded index plus lookups by title and share ID
+SavedIndex = namedtuple('SavedIndex', ['summaries', 'by_title', 'by_share_id'])
+
 # Characters for short IDs (URL-safe)
 SHORT_ID_CHARS = string.ascii_letters + string.digits
 
+# Preheat oven instruction, matched against lowercased step text
+_PREHEAT_RE = re.compile(
+    r'preheat\s+(?:the\s+)?oven\s+to\s+(\d+)\s*°?\s*(f|c|fahrenheit|celsius)?'
+)
+
 
 def generate_short_id(length=6):
     """Generate a random short ID for sharing."""
     return ''.join(random.choice(SHORT_ID_CHARS) for _ in range(length))
 
 
-def load_saved_recipes():
-    """Load saved recipes from JSON file."""
-    if os.path.exists(SAVED_RECIPES_FILE):
+# Write-behind for saved recipe files: the latest data for each path waits
+# here (None means delete) until the background writer flushes it
+_pending_writes = {}
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_save_queue = queue.Queue()
+_writer_thread = None
+
+# Seconds the background writer waits before retrying a failed flush
+WRITE_RETRY_SECONDS = 5
+
+# Bumped on every index save, so ETags change before the write is flushed
+_index_generation = 0
+
+
+def write_json_file(path, data):
+    """Atomically serialize data to a JSON file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    os.replace(tmp_path, path)
+
+
+def read_json_file(path):
+    """Read and parse a JSON file, including writes not yet flushed."""
+    with _pending_lock:
+        if path in _pending_writes:
+            data = _pending_writes[path]
+            if data is None:
+                raise FileNotFoundError(path)
+            return data
+
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def flush_pending_writes():
+    """Write all pending saves and deletes to disk."""
+    with _flush_lock:
+        with _pending_lock:
+            writes = list(_pending_writes.items())
+
+        for path, data in writes:
+            if data is None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            else:
+                write_json_file(path, data)
+
+            with _pending_lock:
+                # Keep the entry if a newer save came in meanwhile
+                if path in _pending_writes and _pending_writes[path] is data:
+                    del _pending_writes[path]
+
+
+def _writer_loop():
+    """Background writer: flush whenever saves are queued, retrying failed flushes."""
+    retry = False
+    while True:
         try:
-            with open(SAVED_RECIPES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
+            # After a failure, retry on a timer even if nothing new is queued
+            _save_queue.get(timeout=WRITE_RETRY_SECONDS if retry else None)
+        except queue.Empty:
+            pass
+        # One flush covers everything queued so far
+        while not _save_queue.empty():
+            _save_queue.get_nowait()
+        try:
+            flush_pending_writes()
+            retry = False
+        except Exception:
+            # Any error: keep the thread alive; failed writes stay pending
+            app.logger.exception('Failed to write saved recipes, retrying in %s seconds',
+                                 WRITE_RETRY_SECONDS)
+            retry = True
+
+
+def queue_json_write(path, data):
+    """Record data to be written to path (None to delete it) in the background."""
+    global _writer_thread
+
+    with _pending_lock:
+        _pending_writes[path] = data
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, daemon=True)
+            _writer_thread.start()
+            # Runs on normal exit, and on SIGTERM via the handler in __main__
+            atexit.register(flush_pending_writes)
+
+    _save_queue.put(path)
+
 
+def summarize_recipe(recipe):
+    """Build the index entry for a saved recipe."""
+    return {field: recipe.get(field) for field in SUMMARY_FIELDS}
 
-def save_recipes_to_file(recipes):
-    """Save recipes to JSON file."""
-    with open(SAVED_RECIPES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(recipes, f, indent=2, ensure_ascii=False)
 
+def saved_recipe_path(recipe_id):
+    """Path of the JSON file holding a saved recipe."""
+    return os.path.join(SAVED_RECIPES_DIR, f"{recipe_id}.json")
 
-def detect_preheat_oven(steps):
+
+def migrate_saved_recipes_file():
+    """Split the legacy saved_recipes.json into per-recipe files and an index."""
+    try:
+        recipes = read_json_file(SAVED_RECIPES_FILE)
+    except (orjson.JSONDecodeError, IOError):
+        return
+
+    for recipe in recipes:
+        save_recipe_file(recipe)
+    # The legacy list is newest first
+    save_saved_index({r['id']: summarize_recipe(r) for r in reversed(recipes)})
+
+
+@functools.lru_cache(maxsize=1)
+def _read_saved_index(mtime):
+    """Read the saved recipes index (cached per file modification time)."""
+    try:
+        summaries = read_json_file(SAVED_RECIPES_INDEX)
+    except (orjson.JSONDecodeError, IOError):
+        summaries = {}
+
+    return SavedIndex(
+        summaries=summaries,
+        by_title={r['title']: recipe_id for recipe_id, r in summaries.items()},
+        by_share_id={r.get('share_id'): recipe_id for recipe_id, r in summaries.items()}
+    )
+
+
+def load_saved_index():
     """
-    Scan steps for preheat oven instructions.
-    Returns a list of preheat instructions found (e.g., "Preheat oven to 350°F").
+    Load the saved recipes index.
+    The result is shared with the cache; copy summaries before changing them.
     """
-    preheat_pattern = re.compile(
-        r'preheat\s+(?:the\s+)?oven\s+to\s+(\d+)\s*°?\s*(F|C|fahrenheit|celsius)?',
-        re.IGNORECASE
-    )
+    try:
+        mtime = os.path.getmtime(SAVED_RECIPES_INDEX)
+    except OSError:
+        # Not on disk yet: either never saved, pending, or still in the legacy file
+        mtime = None
+        with _pending_lock:
+            pending = SAVED_RECIPES_INDEX in _pending_writes
+        if not pending and os.path.exists(SAVED_RECIPES_FILE):
+            migrate_saved_recipes_file()
+    return _read_saved_index(mtime)
 
-    preheat_instructions = []
-    for step in steps:
-        text = step.get('text', '')
-        match = preheat_pattern.search(text)
-        if match:
-            temp = match.group(1)
-            unit = match.group(2) or 'F'
-            # Normalize unit
-            if unit.lower() in ['c', 'celsius']:
-                unit = '°C'
-            else:
-                unit = '°F'
-            preheat_instructions.append(f"Preheat oven to {temp}{unit}")
 
-    return preheat_instructions
+def save_saved_index(summaries):
+    """Save the saved recipes index (summaries keyed by ID, oldest first)."""
+    global _index_generation
+
+    queue_json_write(SAVED_RECIPES_INDEX, summaries)
+    _index_generation += 1
+    _read_saved_index.cache_clear()
+
+
+def saved_index_etag():
+    """ETag for the saved recipes list, from the index mtime and save count."""
+    try:
+        mtime = os.stat(SAVED_RECIPES_INDEX).st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"saved-{mtime}-{_index_generation}"
+
+
+def load_saved_recipe(recipe_id):
+    """Load a full saved recipe by ID, or None if it doesn't exist."""
+    try:
+        return read_json_file(saved_recipe_path(recipe_id))
+    except (orjson.JSONDecodeError, IOError):
+        return None
+
+
+def save_recipe_file(recipe):
+    """Save a full recipe to its own JSON file."""
+    os.makedirs(SAVED_RECIPES_DIR, exist_ok=True)
+    queue_json_write(saved_recipe_path(recipe['id']), recipe)
+
+
+def delete_recipe_file(recipe_id):
+    """Delete a saved recipe's JSON file."""
+    queue_json_write(saved_recipe_path(recipe_id), None)
+
+
+@functools.lru_cache(maxsize=8192)
+def detect_preheat_oven(step_lower):
+    """
+    Check a step (lowercased text) for a preheat oven instruction.
+    Returns the normalized instruction (e.g., "Preheat oven to 350°F") or None.
+    """
+    match = _PREHEAT_RE.search(step_lower)
+    if not match:
+        return None
+
+    temp = match.group(1)
+    unit = match.group(2) or 'f'
+    # Normalize unit
+    if unit in ['c', 'celsius']:
+        unit = '°C'
+    else:
+        unit = '°F'
+    return f"Preheat oven to {temp}{unit}"
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson for jsonify and request parsing."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.json.sort_keys = False
+app.url_map.strict_slashes = False
+
+# Gzip/brotli responses; recipe JSON is highly compressible. Streamed
+# responses (/api/recipe/<id>) are left uncompressed, since compressing them
+# would buffer the whole body and undo the streaming.
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
+
+
+def client_has_etag(etag):
+    """
+    Check If-None-Match for etag, so unchanged data needn't be serialized.
+    Flask-Compress tags compressed responses as "<etag>:<encoding>".
+    """
+    return any(tag.split(':', 1)[0] == etag for tag in request.if_none_match)
+
+
+def not_modified(etag):
+    """Empty 304 response for a client that already has etag."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
 
 # Directory for local recipes
 RECIPES_DIR = 'recipes'
@@ -87,21 +315,27 @@ def process_recipe_steps(recipe_data):
     4. Detect timers
     """
     all_ingredients = recipe_data['ingredients']
+    # Work on the steps column-wise; they are converted to step dicts once, at the end
     steps = recipe_data['steps']
+    if not isinstance(steps, StepTable):
+        steps = StepTable.from_dicts(steps)
 
-    # Detect preheat oven instructions
-    preheat_instructions = detect_preheat_oven(steps)
+    # Preheat oven instructions, filled in while scanning the steps below
+    preheat_instructions = []
 
     # Create initial "ingredients" step
     ingredients_step = {
         'number': 0,
         'text': 'Gather these ingredients:',
         'ingredients': all_ingredients,
-        'timers': [],
+        'timers': (),
         'is_ingredients_list': True,
         'preheat': preheat_instructions
     }
 
+    # Build the ingredient index once per recipe so each step is scanned only once
+    ingredient_index = prepare_ingredient_index(all_ingredients)
+
     # Process each instruction step
     processed_steps = [ingredients_step]
 
@@ -111,29 +345,39 @@ def process_recipe_steps(recipe_data):
         notes_step = {
             'number': len(processed_steps),
             'text': notes,
-            'ingredients': [],
-            'timers': [],
+            'ingredients': (),
+            'timers': (),
             'is_notes_page': True
         }
         processed_steps.append(notes_step)
 
-    for step in steps:
-        # Match ingredients to this step
-        step['ingredients'] = match_ingredients_to_step(step['text'], all_ingredients)
+    # Detect timers for all steps in one scan
+    steps.timers = detect_timers_bulk(steps.texts)
+
+    # Single pass over the step texts: preheat and ingredients together
+    for i, text in enumerate(steps.texts):
+        # Lowercase once; preheat and ingredient matching are case-sensitive
+        step_lower = text.lower()
 
-        # Detect timers in this step
-        step['timers'] = detect_timers(step['text'])
+        # Detect preheat oven instructions
+        preheat = detect_preheat_oven(step_lower)
+        if preheat:
+            preheat_instructions.append(preheat)
 
-        # Renumber
-        step['number'] = len(processed_steps)
-        processed_steps.append(step)
+        # Match ingredients to this step; steps without any share the empty tuple
+        steps.ingredients[i] = match_step(step_lower, ingredient_index) or ()
+
+    # Renumber after the ingredients (and notes) pages
+    first_number = len(processed_steps)
+    steps.numbers = list(range(first_number, first_number + len(steps.texts)))
+    processed_steps.extend(steps.to_dicts())
 
     # Add final "Bon Appetit!" page
     final_step = {
         'number': len(processed_steps),
         'text': 'Bon Appetit!',
-        'ingredients': [],
-        'timers': [],
+        'ingredients': (),
+        'timers': (),
         'is_final_page': True
     }
     processed_steps.append(final_step)
@@ -142,6 +386,40 @@ def process_recipe_steps(recipe_data):
     return recipe_data
 
 
+@functools.lru_cache(maxsize=256)
+def _load_and_process(filepath, mtime):
+    """
+    Parse and process a local recipe file.
+    Cached per file modification time; the result is shared, so don't mutate it.
+    """
+    # Parse straight to a StepTable, skipping the step dicts parse_recipe builds
+    return process_recipe_steps(_parse_recipe_table(filepath))
+
+
+def stream_recipe_json(recipe_data):
+    """
+    Yield a {"success": true, "recipe": ...} JSON body in pieces,
+    one step at a time, instead of serializing it all at once.
+    """
+    option = orjson.OPT_NON_STR_KEYS
+
+    yield b'{"success":true,"recipe":{'
+    for i, (key, value) in enumerate(recipe_data.items()):
+        prefix = orjson.dumps(key, option=option) + b':'
+        if i:
+            prefix = b',' + prefix
+
+        if key == 'steps' and isinstance(value, list):
+            yield prefix + b'['
+            for j, step in enumerate(value):
+                chunk = orjson.dumps(step, option=option)
+                yield b',' + chunk if j else chunk
+            yield b']'
+        else:
+            yield prefix + orjson.dumps(value, option=option)
+    yield b'}}\n'
+
+
 @app.route('/')
 def index():
     """Home page - recipe selection and URL input."""
@@ -167,14 +445,28 @@ def recipe_viewer(recipe_id):
 @app.route('/s/<share_id>')
 def short_url(share_id):
     """Short URL redirect for shared recipes."""
-    recipes = load_saved_recipes()
-    recipe = next((r for r in recipes if r.get('share_id') == share_id), None)
+    recipe_id = load_saved_index().by_share_id.get(share_id)
 
-    if not recipe:
+    if not recipe_id:
         return render_template('index.html'), 404
 
     # Redirect to the full recipe URL
-    return redirect(f"/recipe/saved-{recipe['id']}")
+    return redirect(f"/recipe/saved-{recipe_id}")
+
+
+@functools.lru_cache(maxsize=1)
+def _list_local_recipes(mtime):
+    """List local recipe files (cached per directory modification time)."""
+    recipes = []
+    with os.scandir(RECIPES_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') and entry.is_file():
+                recipe_id = entry.name[:-4]  # Remove .txt extension
+                recipes.append({
+                    'id': recipe_id,
+                    'name': recipe_id.replace('_', ' ').title()
+                })
+    return recipes
 
 
 @app.route('/api/recipes')
@@ -182,19 +474,20 @@ def list_recipes():
     """List all available local recipes."""
     try:
         recipes = []
+        etag = 'recipes-none'
         if os.path.exists(RECIPES_DIR):
-            for filename in os.listdir(RECIPES_DIR):
-                if filename.endswith('.txt'):
-                    recipe_id = filename[:-4]  # Remove .txt extension
-                    recipes.append({
-                        'id': recipe_id,
-                        'name': recipe_id.replace('_', ' ').title()
-                    })
+            mtime = os.path.getmtime(RECIPES_DIR)
+            etag = f"recipes-{mtime}"
+            if client_has_etag(etag):
+                return not_modified(etag)
+            recipes = _list_local_recipes(mtime)
 
-        return jsonify({
+        response = jsonify({
             'success': True,
             'recipes': recipes
         })
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({
             'success': False,
@@ -209,8 +502,7 @@ def get_recipe(recipe_id):
         # Check if this is a saved recipe
         if recipe_id.startswith('saved-'):
             saved_id = recipe_id[6:]  # Remove 'saved-' prefix
-            recipes = load_saved_recipes()
-            recipe_data = next((r for r in recipes if r['id'] == saved_id), None)
+            recipe_data = load_saved_recipe(saved_id)
 
             if not recipe_data:
                 return jsonify({
@@ -219,10 +511,10 @@ def get_recipe(recipe_id):
                 }), 404
 
             # Saved recipes are already processed, return as-is
-            return jsonify({
-                'success': True,
-                'recipe': recipe_data
-            })
+            return Response(
+                stream_with_context(stream_recipe_json(recipe_data)),
+                mimetype='application/json'
+            )
 
         # Build file path for local recipe
         filepath = os.path.join(RECIPES_DIR, f"{recipe_id}.txt")
@@ -233,16 +525,13 @@ def get_recipe(recipe_id):
                 'error': f"Recipe '{recipe_id}' not found"
             }), 404
 
-        # Parse the recipe
-        recipe_data = parse_recipe(filepath)
-
-        # Process steps: add ingredients list, match ingredients, carry over, detect timers
-        recipe_data = process_recipe_steps(recipe_data)
+        # Parse and process the recipe (reused until the file changes)
+        recipe_data = _load_and_process(filepath, os.path.getmtime(filepath))
 
-        return jsonify({
-            'success': True,
-            'recipe': recipe_data
-        })
+        return Response(
+            stream_with_context(stream_recipe_json(recipe_data)),
+            mimetype='application/json'
+        )
 
     except Exception as e:
         return jsonify({
@@ -288,19 +577,18 @@ def scrape_recipe_endpoint():
 @app.route('/api/saved')
 def list_saved_recipes():
     """List all saved recipes."""
-    recipes = load_saved_recipes()
-    # Return summary info only (not full recipe data)
-    summaries = [{
-        'id': r['id'],
-        'share_id': r.get('share_id'),
-        'title': r['title'],
-        'serves': r.get('serves'),
-        'saved_at': r.get('saved_at')
-    } for r in recipes]
-    return jsonify({
+    etag = saved_index_etag()
+    if client_has_etag(etag):
+        return not_modified(etag)
+
+    # The index holds summary info only (not full recipe data)
+    summaries = load_saved_index().summaries
+    response = jsonify({
         'success': True,
-        'recipes': summaries
+        'recipes': list(reversed(summaries.values()))  # Newest first
     })
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/api/saved', methods=['POST'])
@@ -315,19 +603,25 @@ def save_recipe_endpoint():
                 'error': 'Recipe data is required'
             }), 400
 
-        recipes = load_saved_recipes()
+        saved = load_saved_index()
 
         # Check if recipe already exists (by title)
-        existing_index = next(
-            (i for i, r in enumerate(recipes) if r['title'] == data['title']),
-            None
-        )
+        existing_id = saved.by_title.get(data['title'])
 
-        # Keep existing share_id if updating, otherwise generate new one
-        existing_share_id = recipes[existing_index].get('share_id') if existing_index is not None else None
+        # Keep existing id and share_id if updating, otherwise generate new ones
+        if existing_id is not None:
+            recipe_id = existing_id
+            existing_share_id = saved.summaries[existing_id].get('share_id')
+        else:
+            # Timestamp ID; bump it if another save landed in the same millisecond
+            recipe_id = int(datetime.now().timestamp() * 1000)
+            while str(recipe_id) in saved.summaries:
+                recipe_id += 1
+            recipe_id = str(recipe_id)
+            existing_share_id = None
 
         recipe_to_save = {
-            'id': recipes[existing_index]['id'] if existing_index is not None else str(int(datetime.now().timestamp() * 1000)),
+            'id': recipe_id,
             'share_id': existing_share_id or generate_short_id(),
             'title': data['title'],
             'serves': data.get('serves'),
@@ -338,14 +632,15 @@ def save_recipe_endpoint():
             'saved_at': datetime.now().isoformat()
         }
 
-        if existing_index is not None:
-            recipes[existing_index] = recipe_to_save
-            is_update = True
-        else:
-            recipes.insert(0, recipe_to_save)
-            is_update = False
+        # Only this recipe's file is rewritten, plus the small index
+        save_recipe_file(recipe_to_save)
 
-        save_recipes_to_file(recipes)
+        # Updates keep their position in the index; new recipes go at the end
+        summaries = dict(saved.summaries)
+        is_update = existing_id is not None
+        summaries[recipe_to_save['id']] = summarize_recipe(recipe_to_save)
+
+        save_saved_index(summaries)
 
         return jsonify({
             'success': True,
@@ -364,8 +659,7 @@ def save_recipe_endpoint():
 @app.route('/api/saved/<recipe_id>')
 def get_saved_recipe(recipe_id):
     """Get a specific saved recipe."""
-    recipes = load_saved_recipes()
-    recipe = next((r for r in recipes if r['id'] == recipe_id), None)
+    recipe = load_saved_recipe(recipe_id)
 
     if not recipe:
         return jsonify({
@@ -383,17 +677,19 @@ def get_saved_recipe(recipe_id):
 def delete_saved_recipe(recipe_id):
     """Delete a saved recipe."""
     try:
-        recipes = load_saved_recipes()
-        original_length = len(recipes)
-        recipes = [r for r in recipes if r['id'] != recipe_id]
+        summaries = load_saved_index().summaries
 
-        if len(recipes) == original_length:
+        if recipe_id not in summaries:
             return jsonify({
                 'success': False,
                 'error': 'Recipe not found'
             }), 404
 
-        save_recipes_to_file(recipes)
+        summaries = dict(summaries)
+        del summaries[recipe_id]
+
+        save_saved_index(summaries)
+        delete_recipe_file(recipe_id)
 
         return jsonify({
             'success': True
@@ -423,6 +719,10 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
+    # systemd stops the service with SIGTERM, which skips atexit by default;
+    # exit normally instead so pending saved-recipe writes are flushed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
     print(f"Starting Clear Recipes on port {args.port}")
     print(f"Access the app at: http://localhost:{args.port}")
     print(f"For Tailscale access, use: http://<tailscale-hostname>:{args.port}")
@@ -3,8 +3,14 @@ Ingredient matcher for matching ingredients to recipe steps.
 Uses smart matching with variations and stemming.
 """
 
+import functools
 import re
-from typing import List, Set
+from typing import Any, FrozenSet, List
+
+try:
+    import ahocorasick
+except ImportError:  # Fall back to plain substring search
+    ahocorasick = None
 
 
 # Common measurements and quantity words to remove
@@ -25,7 +31,20 @@ MEASUREMENTS = [
     'whole', 'half', 'quarter'
 ]
 
+# All measurements as a single alternation, longest first so that e.g.
+# 'tbsp' is tried before 'tbs'. Matched against lowercased text.
+_MEASURE_RE = re.compile(
+    r'\b(?:' + '|'.join(sorted(MEASUREMENTS, key=len, reverse=True)) + r')\b'
+)
+
+# Leading quantity (whole numbers, fractions, ranges)
+_LEADING_QTY_RE = re.compile(r'^\d+[\s\/-]?\d*\/?\d*\s*')
+
+# Runs of whitespace
+_WS_RE = re.compile(r'\s+')
 
+
+@functools.lru_cache(maxsize=4096)
 def extract_ingredient_name(ingredient_line: str) -> str:
     """
     Extract the core ingredient name from a full ingredient string.
@@ -34,28 +53,28 @@ def extract_ingredient_name(ingredient_line: str) -> str:
         ingredient_line: Full ingredient string (e.g., "2 cups of flour")
 
     Returns:
-        Core ingredient name (e.g., "flour")
+        Core ingredient name, lowercased (e.g., "flour")
     """
     # Remove leading quantities like "1", "2", "1/2", "1-2", "1 1/2"
-    text = re.sub(r'^\d+[\s\/-]?\d*\/?\d*\s*', '', ingredient_line)
+    text = _LEADING_QTY_RE.sub('', ingredient_line.lower())
 
-    # Remove measurements
-    for measure in MEASUREMENTS:
-        # Word boundary matching to avoid partial replacements
-        text = re.sub(rf'\b{measure}\b', '', text, flags=re.IGNORECASE)
+    # Remove measurements (word boundaries avoid partial replacements)
+    text = _MEASURE_RE.sub('', text)
 
     # Split by comma and take first part (handles "eggs, beaten")
     text = text.split(',')[0].strip()
 
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WS_RE.sub(' ', text).strip()
 
     return text
 
 
-def get_ingredient_variations(ingredient_name: str) -> Set[str]:
+@functools.lru_cache(maxsize=4096)
+def get_ingredient_variations(ingredient_name: str) -> FrozenSet[str]:
     """
     Generate variations of an ingredient name for matching.
+    Results are cached, so each name's suffix rules run only once.
 
     Args:
         ingredient_name: Core ingredient name
@@ -90,39 +109,111 @@ def get_ingredient_variations(ingredient_name: str) -> Set[str]:
         if len(last_word) > 3:
             variations.add(last_word.lower())
 
-    return variations
+    return frozenset(variations)
 
 
-def match_ingredients_to_step(step_text: str, ingredients: List[str]) -> List[str]:
+def _is_word_char(char: str) -> bool:
+    """Return True if char is a word character in the regex sense."""
+    return char.isalnum() or char == '_'
+
+
+def _at_word_boundary(text: str, index: int) -> bool:
+    """Return True if there is a word boundary before text[index]."""
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
+
+def prepare_ingredient_index(ingredients: List[str]) -> Any:
     """
-    Match ingredients from the full ingredient list to a specific step's text.
+    Build a matching index over the variations of all ingredients.
+
+    The index maps each variation to its length and the (position, ingredient)
+    pairs that produce it. With pyahocorasick installed it is an Aho-Corasick
+    automaton, so one scan of a step finds all ingredients at once; otherwise
+    it is a plain dict searched with str.find. Build it once per recipe.
 
     Args:
-        step_text: The instruction text for the step
         ingredients: List of all ingredient strings
 
     Returns:
-        List of matched ingredient strings
+        Index to pass to match_step
     """
-    matched = []
-    step_lower = step_text.lower()
+    index = ahocorasick.Automaton() if ahocorasick else {}
 
-    for ingredient in ingredients:
+    for position, ingredient in enumerate(ingredients):
         name = extract_ingredient_name(ingredient)
 
         # Skip empty names
         if not name:
             continue
 
-        variations = get_ingredient_variations(name)
+        for variant in get_ingredient_variations(name):
+            if not variant:
+                continue
+            entry = index.get(variant, None)
+            if entry is None:
+                value = (len(variant), [(position, ingredient)])
+                if ahocorasick:
+                    index.add_word(variant, value)
+                else:
+                    index[variant] = value
+            else:
+                entry[1].append((position, ingredient))
+
+    if ahocorasick:
+        index.make_automaton()
+    return index
+
+
+def match_step(step_lower: str, index: Any) -> List[str]:
+    """
+    Match ingredients to a step using a prepared index.
+
+    Args:
+        step_lower: The instruction text for the step, already lowercased
+        index: Index from prepare_ingredient_index
+
+    Returns:
+        List of matched ingredient strings, in ingredient list order
+    """
+    if not len(index):
+        return []
+
+    hits = {}
+
+    if ahocorasick:
+        for end, (length, owners) in index.iter(step_lower):
+            # Only accept whole-word occurrences
+            start = end - length + 1
+            if _at_word_boundary(step_lower, start) and _at_word_boundary(step_lower, end + 1):
+                hits.update(owners)
+    else:
+        for variant, (length, owners) in index.items():
+            start = step_lower.find(variant)
+            while start != -1:
+                # Only accept whole-word occurrences
+                if _at_word_boundary(step_lower, start) and _at_word_boundary(step_lower, start + length):
+                    hits.update(owners)
+                    break
+                start = step_lower.find(variant, start + 1)
 
-        # Check if any variation appears in the step text as a whole word
-        for variant in variations:
-            if variant and re.search(rf'\b{re.escape(variant)}\b', step_lower):
-                matched.append(ingredient)
-                break
+    return [hits[position] for position in sorted(hits)]
 
-    return matched
+
+def match_ingredients_to_step(step_text: str, ingredients: List[str]) -> List[str]:
+    """
+    Match ingredients from the full ingredient list to a specific step's text.
+    When matching many steps, use prepare_ingredient_index and match_step.
+
+    Args:
+        step_text: The instruction text for the step
+        ingredients: List of all ingredient strings
+
+    Returns:
+        List of matched ingredient strings
+    """
+    return match_step(step_text.lower(), prepare_ingredient_index(ingredients))
 
 
 if __name__ == '__main__':
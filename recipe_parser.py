@@ -3,8 +3,84 @@ Recipe parser for plain text recipe files.
 Parses recipes in the format used in samples/pancakes.txt
 """
 
+import io
 import re
-from typing import Dict, List
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, Iterable, List, Sequence
+
+
+# Numbered step: "1. ", "2. ", etc.
+_STEP_RE = re.compile(r'^(\d+)\.\s+(.+)$')
+
+
+class Section(IntEnum):
+    """Part of a recipe file that the parser is currently reading."""
+    TITLE = 0
+    META = 1
+    INGREDIENTS = 2
+    NOTES = 3
+    INSTRUCTIONS = 4
+
+
+# Section header lines (lowercased) and the section each one starts
+_SECTION_HEADERS = {
+    'ingredients:': Section.INGREDIENTS,
+    'notes:': Section.NOTES,
+    'instructions:': Section.INSTRUCTIONS,
+}
+
+# Longest header, so longer lines can skip the lookup without lowercasing
+_MAX_HEADER_LEN = max(len(header) for header in _SECTION_HEADERS)
+
+# Marks sentence cuts; unprintable, so it never occurs in fast-path text
+_SENTENCE_MARK = '\x00'
+
+
+@dataclass
+class StepTable:
+    """
+    Recipe steps as parallel lists, one entry per step, so batch passes
+    (timers, ingredients) can work on whole columns at once. The public
+    parsers return step dictionaries (via to_dicts()); _parse_recipe_table
+    hands the table itself to callers that process the steps further.
+    """
+    numbers: List[int] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    ingredients: List[Sequence[str]] = field(default_factory=list)
+    timers: List[Sequence[Dict]] = field(default_factory=list)
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> 'StepTable':
+        """Build a table of steps numbered from 1, with no ingredients or timers yet."""
+        count = len(texts)
+        return cls(
+            numbers=list(range(1, count + 1)),
+            texts=texts,
+            ingredients=[()] * count,
+            timers=[()] * count,
+        )
+
+    @classmethod
+    def from_dicts(cls, steps: List[Dict]) -> 'StepTable':
+        """Build a table from step dictionaries."""
+        return cls(
+            numbers=[step['number'] for step in steps],
+            texts=[step['text'] for step in steps],
+            ingredients=[step['ingredients'] for step in steps],
+            timers=[step['timers'] for step in steps],
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def to_dicts(self) -> List[Dict]:
+        """Convert to step dictionaries with number, text, ingredients, timers."""
+        return [
+            {'number': number, 'text': text, 'ingredients': ingredients, 'timers': timers}
+            for number, text, ingredients, timers
+            in zip(self.numbers, self.texts, self.ingredients, self.timers)
+        ]
 
 
 def parse_recipe(filepath: str) -> Dict:
@@ -15,12 +91,18 @@ def parse_recipe(filepath: str) -> Dict:
         filepath: Path to the recipe text file
 
     Returns:
-        Dictionary containing structured recipe data
+        Dictionary containing structured recipe data, with steps as a list
+        of step dictionaries
     """
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+    recipe = _parse_recipe_table(filepath)
+    recipe['steps'] = recipe['steps'].to_dicts()
+    return recipe
 
-    return parse_recipe_text(content)
+
+def _parse_recipe_table(filepath: str) -> Dict:
+    """Parse a recipe file like parse_recipe, but keep the steps as a StepTable."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return _parse_recipe_stream(f)
 
 
 def parse_recipe_text(content: str) -> Dict:
@@ -31,99 +113,106 @@ def parse_recipe_text(content: str) -> Dict:
         content: Recipe text content
 
     Returns:
-        Dictionary containing structured recipe data
+        Dictionary containing structured recipe data, with steps as a list
+        of step dictionaries
     """
-    lines = content.split('\n')
-
-    # Extract title (first non-empty line)
-    title = ""
-    for line in lines:
-        if line.strip():
-            title = line.strip()
-            break
+    # StringIO splits on '\n' only, like str.split('\n')
+    recipe = _parse_recipe_stream(io.StringIO(content))
+    recipe['steps'] = recipe['steps'].to_dicts()
+    return recipe
 
-    # Extract metadata (serves)
-    serves = ""
-    for line in lines:
-        if line.lower().startswith("serves:"):
-            serves = line.split(":", 1)[1].strip()
-            break
 
-    # Find ingredient section
-    ingredients = []
-    in_ingredients = False
-    for line in lines:
-        stripped = line.strip()
+def _parse_recipe_stream(lines: Iterable[str]) -> Dict:
+    """
+    Parse recipe lines as they are read, without holding the whole text.
 
-        if stripped.lower() == "ingredients:":
-            in_ingredients = True
-            continue
+    Args:
+        lines: Iterable of recipe lines, e.g. an open file
 
-        if stripped.lower() == "instructions:":
-            in_ingredients = False
-            break
+    Returns:
+        Dictionary containing structured recipe data, with steps as a StepTable
+    """
+    title = ""
+    serves = ""
+    ingredients = []
+    notes_lines = None  # Created only if a Notes: header is seen
+    steps = []
+    current_step = None
+    text_parts = []
+    section = Section.TITLE
 
-        if in_ingredients and stripped:
-            ingredients.append(stripped)
+    # Local aliases for names used on every line
+    find_header = _SECTION_HEADERS.get
+    match_numbered_step = _STEP_RE.match
+    add_ingredient = ingredients.append
+    add_step = steps.append
 
-    # Find notes section
-    notes = None
-    in_notes = False
-    notes_lines = []
+    # Single pass: section headers switch where the following lines go
     for line in lines:
         stripped = line.strip()
-
-        if stripped.lower() == "notes:":
-            in_notes = True
+        if not stripped:
             continue
 
-        if in_notes and stripped.lower() in ["instructions:", "ingredients:"]:
-            in_notes = False
-            break
-
-        if in_notes and stripped:
-            notes_lines.append(stripped)
-
-    if notes_lines:
-        notes = '\n'.join(notes_lines)
+        # Only short lines can be headers, so most lines are never lowercased
+        header = None
+        if len(stripped) <= _MAX_HEADER_LEN:
+            header = find_header(stripped.lower())
+
+        # Title is the first non-empty line. If that line is a header or
+        # Serves: line it is still handled below, so untitled files keep it.
+        if section == Section.TITLE:
+            title = stripped
+            section = Section.META
+            if header is None and stripped[:7].lower() != "serves:":
+                continue
+
+        if header is not None:
+            section = header
+            if header == Section.NOTES and notes_lines is None:
+                notes_lines = []
+            continue
 
-    # Find instruction steps
-    steps = []
-    in_instructions = False
-    current_step = None
+        # Metadata (serves)
+        if stripped[:7].lower() == "serves:":
+            if not serves:
+                serves = stripped.split(":", 1)[1].strip()
+            continue
 
-    for line in lines:
-        stripped = line.strip()
+        if section == Section.INGREDIENTS:
+            add_ingredient(stripped)
 
-        if stripped.lower() == "instructions:":
-            in_instructions = True
-            continue
+        elif section == Section.NOTES:
+            notes_lines.append(stripped)
 
-        if in_instructions:
+        elif section == Section.INSTRUCTIONS:
             # Match numbered steps: "1. ", "2. ", etc.
-            match = re.match(r'^(\d+)\.\s+(.+)$', stripped)
+            match = match_numbered_step(stripped)
             if match:
                 # Save previous step if exists
                 if current_step:
-                    steps.append(current_step)
+                    current_step['text'] = ' '.join(text_parts)
+                    add_step(current_step)
 
-                # Start new step
+                # Start new step; its text is joined when the step is saved
                 current_step = {
                     'number': int(match.group(1)),
-                    'text': match.group(2),
-                    'ingredients': [],
-                    'timers': []
+                    'ingredients': (),
+                    'timers': ()
                 }
-            elif current_step and stripped:
+                text_parts = [match.group(2)]
+            elif current_step:
                 # Multi-line step continuation
-                current_step['text'] += ' ' + stripped
+                text_parts.append(stripped)
 
     # Add the last step
     if current_step:
+        current_step['text'] = ' '.join(text_parts)
         steps.append(current_step)
 
+    notes = '\n'.join(notes_lines) if notes_lines else None
+
     # Break steps into individual sentences
-    sentence_steps = break_into_sentences(steps)
+    sentence_steps = _sentence_table(steps)
 
     return {
         'title': title,
@@ -134,6 +223,83 @@ def parse_recipe_text(content: str) -> Dict:
     }
 
 
+class RecipeBatchParser:
+    """
+    Parse many recipes, sharing one copy of each repeated string.
+
+    Ingredient lines ("1 teaspoon salt"), serving sizes and short sentences
+    ("Serve warm.") recur across a collection. An intern pool makes every
+    recipe parsed by the same instance reference a single string object.
+    """
+
+    def __init__(self):
+        self._pool: Dict[str, str] = {}
+
+    def parse(self, filepath: str) -> Dict:
+        """Parse a recipe file, like parse_recipe."""
+        return self._dedupe(parse_recipe(filepath))
+
+    def parse_text(self, content: str) -> Dict:
+        """Parse recipe text, like parse_recipe_text."""
+        return self._dedupe(parse_recipe_text(content))
+
+    def _dedupe(self, recipe: Dict) -> Dict:
+        """Replace the recipe's strings with their pooled copies."""
+        intern = self._pool.setdefault
+        recipe['serves'] = intern(recipe['serves'], recipe['serves'])
+        recipe['ingredients'] = [intern(line, line) for line in recipe['ingredients']]
+        for step in recipe['steps']:
+            step['text'] = intern(step['text'], step['text'])
+        return recipe
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text after each '.', '!' or '?' that is followed by whitespace.
+    Pieces keep their punctuation and may have surrounding whitespace.
+
+    Args:
+        text: Step text
+
+    Returns:
+        List of sentence strings
+    """
+    # Printable ASCII has no whitespace but ' ', so marking each cut with
+    # C-level replaces and splitting on the marks finds every sentence
+    if text.isascii() and text.isprintable():
+        return (
+            text.replace('. ', '.' + _SENTENCE_MARK + ' ')
+            .replace('! ', '!' + _SENTENCE_MARK + ' ')
+            .replace('? ', '?' + _SENTENCE_MARK + ' ')
+            .split(_SENTENCE_MARK)
+        )
+
+    return _scan_sentences(text)
+
+
+def _scan_sentences(text: str) -> List[str]:
+    """Split text like split_sentences, by scanning for each punctuation mark."""
+    sentences = []
+    length = len(text)
+    start = 0
+    pos = 0
+
+    while True:
+        # Next sentence-ending punctuation at or after pos
+        ends = [i for i in (text.find('.', pos), text.find('!', pos), text.find('?', pos)) if i != -1]
+        if not ends:
+            break
+
+        end = min(ends) + 1
+        if end < length and text[end].isspace():
+            sentences.append(text[start:end])
+            start = end
+        pos = end
+
+    sentences.append(text[start:])
+    return sentences
+
+
 def break_into_sentences(steps: List[Dict]) -> List[Dict]:
     """
     Break recipe steps into individual sentences.
@@ -144,26 +310,23 @@ def break_into_sentences(steps: List[Dict]) -> List[Dict]:
     Returns:
         List of sentence-level steps
     """
-    sentence_steps = []
-
-    for step in steps:
-        text = step['text']
-
-        # Split by sentence boundaries (., !, ?)
-        # Use regex to split but keep the punctuation
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if sentence:
-                sentence_steps.append({
-                    'number': len(sentence_steps) + 1,
-                    'text': sentence,
-                    'ingredients': [],
-                    'timers': []
-                })
-
-    return sentence_steps
+    return _sentence_table(steps).to_dicts()
+
+
+def _sentence_table(steps: List[Dict]) -> StepTable:
+    """Break recipe steps into individual sentences, as a StepTable."""
+    # Split by sentence boundaries (., !, ?), keeping the punctuation
+    split = split_sentences
+    strip = str.strip
+    sentences = [
+        sentence
+        for step in steps
+        for sentence in map(strip, split(step['text']))
+        if sentence
+    ]
+
+    # Number and pad all columns at once rather than appending per sentence
+    return StepTable.from_texts(sentences)
 
 
 if __name__ == '__main__':
@@ -3,17 +3,42 @@ Recipe scraper for extracting recipes from URLs.
 Uses the recipe-scrapers library which supports 100+ recipe websites.
 """
 
+import asyncio
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import orjson
 from recipe_scrapers import scrape_me
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import re
+from recipe_parser import break_into_sentences
 
 
-def scrape_recipe(url: str) -> Dict:
+# Blank lines between paragraphs
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n\n+')
+
+# How long a cached scrape result (in memory or on disk) stays fresh, in seconds
+SCRAPE_CACHE_TTL = 24 * 60 * 60
+
+# Most scrape results kept in memory
+SCRAPE_CACHE_SIZE = 128
+
+# In-memory scrape results: url -> (scrape time, recipe), least recently used first
+_scrape_cache = OrderedDict()
+_scrape_cache_lock = threading.Lock()
+
+
+def scrape_recipe(url: str, *, cache_dir: Optional[str] = None) -> Dict:
     """
     Scrape a recipe from a URL using recipe-scrapers library.
+    Results are cached per URL in memory and, if cache_dir is given, on disk.
 
     Args:
         url: URL of the recipe page
+        cache_dir: Optional directory for cached results
 
     Returns:
         Dictionary containing structured recipe data compatible with our format
@@ -21,6 +46,60 @@ def scrape_recipe(url: str) -> Dict:
     Raises:
         Exception: If scraping fails or URL is not supported
     """
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+        try:
+            if time.time() - os.path.getmtime(cache_path) < SCRAPE_CACHE_TTL:
+                with open(cache_path, 'rb') as f:
+                    return orjson.loads(f.read())
+        except (OSError, ValueError):
+            pass
+
+    scraped_at, cached = _scrape_recipe_cached(url)
+
+    # Callers modify the recipe, so never hand out the cached object itself
+    recipe = copy.deepcopy(cached)
+
+    if cache_path:
+        # The disk cache is best effort; an unwritable directory must not fail the scrape
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(recipe))
+            # Date the file by the scrape, so a result from memory does not look newer
+            os.utime(tmp_path, (scraped_at, scraped_at))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    return recipe
+
+
+def _scrape_recipe_cached(url: str) -> Tuple[float, Dict]:
+    """
+    Scrape a recipe, reusing an in-memory result younger than SCRAPE_CACHE_TTL.
+    Returns (scrape time, recipe); do not modify the recipe.
+    """
+    now = time.time()
+    with _scrape_cache_lock:
+        entry = _scrape_cache.get(url)
+        if entry is not None and now - entry[0] < SCRAPE_CACHE_TTL:
+            _scrape_cache.move_to_end(url)
+            return entry
+
+    entry = (now, _scrape_recipe_uncached(url))
+    with _scrape_cache_lock:
+        _scrape_cache[url] = entry
+        _scrape_cache.move_to_end(url)
+        while len(_scrape_cache) > SCRAPE_CACHE_SIZE:
+            _scrape_cache.popitem(last=False)
+    return entry
+
+
+def _scrape_recipe_uncached(url: str) -> Dict:
+    """Scrape a recipe from a URL, without any caching."""
     try:
         scraper = scrape_me(url, wild_mode=True)
 
@@ -76,6 +155,69 @@ def scrape_recipe(url: str) -> Dict:
         raise Exception(f"Failed to scrape recipe from {url}: {str(e)}")
 
 
+async def scrape_recipes(urls: List[str], concurrency: int = 8) -> List[Dict]:
+    """
+    Scrape several recipes concurrently, each in a worker thread.
+
+    Scraping is dominated by network latency, so overlapping requests speeds
+    up batches. The concurrency limit also bounds how many wild_mode fetches
+    hit the target sites at once.
+
+    Args:
+        urls: URLs of the recipe pages
+        concurrency: Maximum number of scrapes in flight
+
+    Returns:
+        List of recipe dictionaries, in the same order as urls
+
+    Raises:
+        Exception: If any scrape fails
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scrape_one(url: str) -> Dict:
+        async with semaphore:
+            return await asyncio.to_thread(scrape_recipe, url)
+
+    return await asyncio.gather(*(scrape_one(url) for url in urls))
+
+
+def _match_numbered(line: str) -> Optional[Tuple[int, str]]:
+    """
+    Match a numbered step line: "1.", "2)", "Step 3:", etc.
+
+    Args:
+        line: Stripped instruction line
+
+    Returns:
+        (step number, step text) tuple, or None if the line is not numbered
+    """
+    i = 0
+    length = len(line)
+
+    # Optional "Step" prefix followed by whitespace
+    if line[:4].lower() == 'step' and length > 4 and line[4].isspace():
+        i = 5
+        while i < length and line[i].isspace():
+            i += 1
+
+    # isdecimal, not isdigit: superscript digits are not valid for int()
+    start = i
+    while i < length and line[i].isdecimal():
+        i += 1
+    if i == start or i == length or line[i] not in '.:)':
+        return None
+    number = int(line[start:i])
+
+    i += 1
+    while i < length and line[i].isspace():
+        i += 1
+    if i == length:
+        return None
+
+    return number, line[i:]
+
+
 def parse_instructions(instructions_text: str) -> List[Dict]:
     """
     Parse instruction text into numbered steps.
@@ -92,8 +234,13 @@ def parse_instructions(instructions_text: str) -> List[Dict]:
     lines = instructions_text.split('\n')
 
     current_step = None
+    text_parts = []
     step_number = 1
 
+    # Local aliases for names used on every line
+    match_numbered = _match_numbered
+    add_step = steps.append
+
     for line in lines:
         stripped = line.strip()
 
@@ -101,50 +248,52 @@ def parse_instructions(instructions_text: str) -> List[Dict]:
             continue
 
         # Try to match numbered steps (1., 2., Step 1:, etc.)
-        numbered_match = re.match(r'^(?:Step\s+)?(\d+)[\.\:\)]\s*(.+)$', stripped, re.IGNORECASE)
+        numbered_match = match_numbered(stripped)
 
         if numbered_match:
             # Save previous step
             if current_step:
-                steps.append(current_step)
+                current_step['text'] = ' '.join(text_parts)
+                add_step(current_step)
 
-            # Start new step
-            step_number = int(numbered_match.group(1))
+            # Start new step; its text is joined when the step is saved
+            step_number, text = numbered_match
             current_step = {
                 'number': step_number,
-                'text': numbered_match.group(2),
-                'ingredients': [],
-                'timers': []
+                'ingredients': (),
+                'timers': ()
             }
+            text_parts = [text]
         elif current_step:
             # Continuation of current step
-            current_step['text'] += ' ' + stripped
+            text_parts.append(stripped)
         else:
             # No numbered format found - treat each paragraph as a step
             current_step = {
                 'number': step_number,
                 'text': stripped,
-                'ingredients': [],
-                'timers': []
+                'ingredients': (),
+                'timers': ()
             }
-            steps.append(current_step)
+            add_step(current_step)
             current_step = None
             step_number += 1
 
     # Add the last step if exists
     if current_step:
+        current_step['text'] = ' '.join(text_parts)
         steps.append(current_step)
 
     # If no steps were parsed (no numbered format), split by sentences/paragraphs
     if not steps:
-        paragraphs = re.split(r'\n\n+', instructions_text)
+        paragraphs = _PARAGRAPH_SPLIT_RE.split(instructions_text)
         for i, paragraph in enumerate(paragraphs, 1):
             if paragraph.strip():
                 steps.append({
                     'number': i,
                     'text': paragraph.strip(),
-                    'ingredients': [],
-                    'timers': []
+                    'ingredients': (),
+                    'timers': ()
                 })
 
     # Break steps into individual sentences
@@ -153,38 +302,6 @@ def parse_instructions(instructions_text: str) -> List[Dict]:
     return sentence_steps
 
 
-def break_into_sentences(steps: List[Dict]) -> List[Dict]:
-    """
-    Break recipe steps into individual sentences.
-
-    Args:
-        steps: List of step dictionaries with 'text' field
-
-    Returns:
-        List of sentence-level steps
-    """
-    sentence_steps = []
-
-    for step in steps:
-        text = step['text']
-
-        # Split by sentence boundaries (., !, ?)
-        # Use regex to split but keep the punctuation
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if sentence:
-                sentence_steps.append({
-                    'number': len(sentence_steps) + 1,
-                    'text': sentence,
-                    'ingredients': [],
-                    'timers': []
-                })
-
-    return sentence_steps
-
-
 if __name__ == '__main__':
     # Test with a sample URL (uncomment to test with a real URL)
     # url = "https://www.allrecipes.com/recipe/21014/good-old-fashioned-pancakes/"
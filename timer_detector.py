@@ -3,8 +3,46 @@ Timer detector for finding timing information in recipe steps.
 Detects phrases like "5 minutes", "1 hour", "30 seconds" and converts to seconds.
 """
 
+import bisect
+import functools
 import re
-from typing import List, Dict
+import threading
+from typing import Iterator, List, Dict, Sequence, Tuple
+
+
+# Time durations: a single value ("5 minutes") or a range ("5-10 minutes",
+# "1 to 2 hours"), with the unit's first letter selecting the multiplier
+_TIMER_PATTERN = (
+    r'(?P<lo>\d+(?:\.\d+)?)(?:\s*(?:to|-)\s*(?P<hi>\d+(?:\.\d+)?))?'
+    r'\s*(?P<unit>hours?|hrs?|minutes?|mins?|seconds?|secs?)'
+)
+
+# Case-sensitive, for lowercased text; the usual case
+_TIMER_LOWER_RE = re.compile(_TIMER_PATTERN)
+
+# Case-insensitive, for text whose case folding lower() cannot reproduce
+_TIMER_RE = re.compile(_TIMER_PATTERN, re.IGNORECASE)
+
+# Seconds per unit, keyed by the unit's first letter
+_UNIT_SECONDS = {'h': 3600, 'm': 60, 's': 1}
+
+# Substrings every unit contains (lowercased), so texts with none can skip the regex
+_UNIT_KEYWORDS = ('min', 'sec', 'hr', 'hour')
+
+# Non-ASCII letters that IGNORECASE matches to unit letters but lower() keeps
+_CASE_ODDITIES = ('\u017f', '\u0131', '\u0130')
+
+# Plural suffix, indexed by (count != 1)
+_PLURAL = ('', 's')
+
+# Joins steps for bulk detection; not whitespace, so no match can span two steps
+_STEP_SEPARATOR = '\x00'
+
+# Detected timers per step text, shared by detect_timers and detect_timers_bulk,
+# since phrases like "Bake for 30 minutes" recur; oldest entries go first
+_TIMER_CACHE_SIZE = 8192
+_timer_cache = {}
+_timer_cache_lock = threading.Lock()
 
 
 def detect_timers(step_text: str) -> List[Dict]:
@@ -17,45 +55,122 @@ def detect_timers(step_text: str) -> List[Dict]:
     Returns:
         List of timer dictionaries with text, duration_seconds, and display
     """
-    timers = []
-
-    # Patterns for matching time durations
-    # Format: (pattern, multiplier_in_seconds)
-    patterns = [
-        (r'(\d+(?:\.\d+)?)\s*(?:to|-)\s*(\d+(?:\.\d+)?)\s*(hours?|hrs?)', 3600),  # "1-2 hours"
-        (r'(\d+(?:\.\d+)?)\s*(hours?|hrs?)', 3600),  # "2 hours"
-        (r'(\d+(?:\.\d+)?)\s*(?:to|-)\s*(\d+(?:\.\d+)?)\s*(minutes?|mins?)', 60),  # "5-10 minutes"
-        (r'(\d+(?:\.\d+)?)\s*(minutes?|mins?)', 60),  # "5 minutes"
-        (r'(\d+(?:\.\d+)?)\s*(?:to|-)\s*(\d+(?:\.\d+)?)\s*(seconds?|secs?)', 1),  # "30-45 seconds"
-        (r'(\d+(?:\.\d+)?)\s*(seconds?|secs?)', 1),  # "30 seconds"
+    return _timer_dicts(_detect_timers_cached(step_text))
+
+
+def _timer_dicts(timers: Tuple[Tuple[str, int, str], ...]) -> List[Dict]:
+    """Build fresh timer dictionaries from (text, duration_seconds, display) tuples."""
+    return [
+        {'text': text, 'duration_seconds': duration, 'display': display}
+        for text, duration, display in timers
     ]
 
-    for pattern, multiplier in patterns:
-        matches = re.finditer(pattern, step_text, re.IGNORECASE)
-        for match in matches:
-            # Check if it's a range (e.g., "5-10 minutes")
-            if len(match.groups()) > 2 and match.group(2) and match.group(2)[0].isdigit():
-                # Range detected - use the average
-                num1 = float(match.group(1))
-                num2 = float(match.group(2))
-                duration = int((num1 + num2) / 2 * multiplier)
-            else:
-                # Single value
-                num = float(match.group(1))
-                duration = int(num * multiplier)
-
-            timers.append({
-                'text': match.group(0),
-                'duration_seconds': duration,
-                'display': format_duration(duration)
-            })
 
+def _detect_timers_cached(step_text: str) -> Tuple[Tuple[str, int, str], ...]:
+    """Detect timers as immutable (text, duration_seconds, display) tuples, cached per text."""
+    with _timer_cache_lock:
+        timers = _timer_cache.get(step_text)
+    if timers is None:
+        step_lower = step_text.lower()
+        if _may_have_timer(step_text, step_lower):
+            timers = tuple(
+                _parse_timer(match, step_text)
+                for match in _find_timers(step_text, step_lower)
+            )
+        else:
+            timers = ()
+        _cache_timers(step_text, timers)
     return timers
 
 
+def _cache_timers(step_text: str, timers: Tuple[Tuple[str, int, str], ...]) -> None:
+    """Remember the timers found in step_text, dropping the oldest entry when full."""
+    with _timer_cache_lock:
+        if len(_timer_cache) >= _TIMER_CACHE_SIZE and step_text not in _timer_cache:
+            del _timer_cache[next(iter(_timer_cache))]
+        _timer_cache[step_text] = timers
+
+
+def _may_have_timer(step_text: str, step_lower: str) -> bool:
+    """Cheap prefilter: return False only if _TIMER_RE cannot match step_text."""
+    if any(keyword in step_lower for keyword in _UNIT_KEYWORDS):
+        return True
+    return not step_text.isascii() and any(char in step_text for char in _CASE_ODDITIES)
+
+
+def _find_timers(step_text: str, step_lower: str) -> Iterator[re.Match]:
+    """
+    Find timer matches whose offsets index step_text.
+
+    Scans step_lower case-sensitively when lowercasing kept every offset and
+    the text has no letters that only IGNORECASE folds to a unit letter.
+    """
+    if len(step_lower) == len(step_text) and (
+        step_text.isascii() or not any(char in step_text for char in _CASE_ODDITIES)
+    ):
+        return _TIMER_LOWER_RE.finditer(step_lower)
+    return _TIMER_RE.finditer(step_text)
+
+
+def _parse_timer(match: re.Match, step_text: str) -> Tuple[str, int, str]:
+    """Convert a timer match in step_text to a (text, duration_seconds, display) tuple."""
+    multiplier = _UNIT_SECONDS[match.group('unit')[0].casefold()]
+    low = float(match.group('lo'))
+    high = match.group('hi')
+
+    if high:
+        # Range detected - use the average
+        duration = int((low + float(high)) / 2 * multiplier)
+    else:
+        duration = int(low * multiplier)
+
+    return step_text[match.start():match.end()], duration, format_duration(duration)
+
+
+def detect_timers_bulk(steps: List[str]) -> List[Sequence[Dict]]:
+    """
+    Detect timers in many steps with a single scan over the joined text.
+    Steps already in the timer cache are not scanned again.
+
+    Args:
+        steps: Instruction texts, one per step
+
+    Returns:
+        List of timer lists (as from detect_timers), aligned with steps;
+        steps without timers share one empty tuple
+    """
+    with _timer_cache_lock:
+        found = [_timer_cache.get(text) for text in steps]
+    missing = [i for i, timers in enumerate(found) if timers is None]
+
+    # Only scan steps that mention a unit, noting where each starts in the corpus
+    lowered = {i: steps[i].lower() for i in missing}
+    candidates = [i for i in missing if _may_have_timer(steps[i], lowered[i])]
+    starts = []
+    offset = 0
+    for i in candidates:
+        starts.append(offset)
+        offset += len(steps[i]) + len(_STEP_SEPARATOR)
+
+    scanned = {i: [] for i in candidates}
+    corpus = _STEP_SEPARATOR.join([steps[i] for i in candidates])
+    corpus_lower = _STEP_SEPARATOR.join([lowered[i] for i in candidates])
+    for match in _find_timers(corpus, corpus_lower):
+        step_index = candidates[bisect.bisect_right(starts, match.start()) - 1]
+        scanned[step_index].append(_parse_timer(match, corpus))
+
+    for i in missing:
+        found[i] = tuple(scanned.get(i, ()))
+        _cache_timers(steps[i], found[i])
+
+    return [_timer_dicts(timers) if timers else () for timers in found]
+
+
+@functools.lru_cache(maxsize=512)
 def format_duration(seconds: int) -> str:
     """
     Format duration in seconds to human-readable string.
+    Cached, since recipes reuse a handful of durations.
 
     Args:
         seconds: Duration in seconds
@@ -64,25 +179,18 @@ def format_duration(seconds: int) -> str:
         Formatted string (e.g., "5 minutes", "1 hour 30 minutes")
     """
     if seconds >= 3600:
-        hours = seconds // 3600
-        remaining_minutes = (seconds % 3600) // 60
-
-        if remaining_minutes > 0:
-            return f"{hours} hour{'s' if hours > 1 else ''} {remaining_minutes} minute{'s' if remaining_minutes > 1 else ''}"
-        else:
-            return f"{hours} hour{'s' if hours > 1 else ''}"
-
+        hours, remainder = divmod(seconds, 3600)
+        text = f"{hours} hour{_PLURAL[hours != 1]}"
+        rest, rest_unit = remainder // 60, 'minute'
     elif seconds >= 60:
-        minutes = seconds // 60
-        remaining_seconds = seconds % 60
-
-        if remaining_seconds > 0:
-            return f"{minutes} minute{'s' if minutes > 1 else ''} {remaining_seconds} second{'s' if remaining_seconds > 1 else ''}"
-        else:
-            return f"{minutes} minute{'s' if minutes > 1 else ''}"
-
+        minutes, rest = divmod(seconds, 60)
+        text = f"{minutes} minute{_PLURAL[minutes != 1]}"
+        rest_unit = 'second'
     else:
-        return f"{seconds} second{'s' if seconds != 1 else ''}"
+        return f"{seconds} second{_PLURAL[seconds != 1]}"
+
+    # Append the remaining smaller unit, if any
+    return f"{text} {rest} {rest_unit}{_PLURAL[rest != 1]}" if rest else text
 
 
 if __name__ == '__main__':